@@ -78,30 +78,51 @@ export default function App() {
 
   useEffect(() => {
     let timer;
+    let source;
+    let finished = false;
     if (polling && jobId) {
+      const applyState = (data) => {
+        finished = data.status === 'done' || data.status === 'error';
+        setStatus(data.status);
+        setOutputPath(data.output_path || '');
+        setErrorMsg(data.error || '');
+        if (data.status === 'done') {
+          setDownloadUrl(`${API_BASE}/result/${jobId}`);
+          stopPolling();
+        } else if (data.status === 'error') {
+          stopPolling();
+        }
+      };
       const poll = async () => {
         try {
           const res = await axios.get(`${API_BASE}/status/${jobId}`);
-          const data = res.data;
-          setStatus(data.status);
-          setOutputPath(data.output_path || '');
-          setErrorMsg(data.error || '');
-          if (data.status === 'done') {
-            setDownloadUrl(`${API_BASE}/result/${jobId}`);
-            stopPolling();
-          } else if (data.status === 'error') {
-            stopPolling();
-          }
+          applyState(res.data);
         } catch (err) {
           console.error(err);
           stopPolling();
           message.error('查询状态失败');
         }
       };
-      poll();
-      timer = setInterval(poll, 2000);
+      const startPolling = () => {
+        poll();
+        timer = setInterval(poll, 2000);
+      };
+      if (window.EventSource) {
+        // 优先用 SSE 接收状态推送，连接失败时回退为定时轮询
+        source = new EventSource(`${API_BASE}/events/${jobId}`);
+        source.onmessage = (evt) => applyState(JSON.parse(evt.data));
+        source.onerror = () => {
+          source.close();
+          source = undefined;
+          // 服务端在任务结束后主动断开，此时无需回退
+          if (!finished) startPolling();
+        };
+      } else {
+        startPolling();
+      }
     }
     return () => {
+      if (source) source.close();
       if (timer) clearInterval(timer);
     };
   }, [polling, jobId]);
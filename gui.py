@@ -1,7 +1,10 @@
 """
 Tkinter 桌面 GUI 入口。
 """
+import collections
 import os
+import subprocess
+import sys
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
@@ -13,23 +16,52 @@ from main import run_pipeline
 
 class TextHandler(logging.Handler):
     """
-    将日志写入 Tkinter 文本框的 Handler，线程安全使用 after。
+    将日志写入 Tkinter 文本框的 Handler：emit 只入缓冲，主线程定时批量刷新到控件。
     """
 
-    def __init__(self, widget: tk.Text):
+    FLUSH_INTERVAL_MS = 100
+
+    def __init__(self, widget: tk.Text, max_lines: int = 2000):
         super().__init__()
         self.widget = widget
+        self.max_lines = max_lines
         self.widget.configure(state=tk.DISABLED)
+        self._buf = collections.deque()
+        self._buf_lock = threading.Lock()
+        self._after_id = self.widget.after(self.FLUSH_INTERVAL_MS, self._flush)
 
     def emit(self, record):
         msg = self.format(record)
-        self.widget.after(0, self._append, msg)
+        with self._buf_lock:
+            self._buf.append(msg)
 
-    def _append(self, msg: str):
-        self.widget.configure(state=tk.NORMAL)
-        self.widget.insert(tk.END, msg + "\n")
-        self.widget.see(tk.END)
-        self.widget.configure(state=tk.DISABLED)
+    def _flush(self, reschedule: bool = True):
+        with self._buf_lock:
+            msgs, self._buf = self._buf, collections.deque()
+        if msgs:
+            self.widget.configure(state=tk.NORMAL)
+            self.widget.insert(tk.END, "\n".join(msgs) + "\n")
+            # 只保留最近 max_lines 行，控制内存与重绘开销
+            line_count = int(self.widget.index("end-1c").split(".")[0])
+            if self.max_lines > 0 and line_count > self.max_lines:
+                self.widget.delete("1.0", f"{line_count - self.max_lines}.0")
+            self.widget.see(tk.END)
+            self.widget.configure(state=tk.DISABLED)
+        if reschedule:
+            self._after_id = self.widget.after(self.FLUSH_INTERVAL_MS, self._flush)
+
+    def close(self):
+        """
+        停止定时刷新并写出剩余日志，需在控件销毁前调用。
+        """
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+                self._flush(reschedule=False)
+            except tk.TclError:
+                pass
+            self._after_id = None
+        super().close()
 
 
 class App(tk.Tk):
@@ -59,10 +91,19 @@ class App(tk.Tk):
 
         # 日志
         self.logger = setup_logging()
-        handler = TextHandler(self.log_text)
-        handler.setLevel(logging.INFO)
-        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-        self.logger.addHandler(handler)
+        self.log_handler = TextHandler(self.log_text, max_lines=int(os.getenv("MERGE_GUI_LOG_LINES", "2000")))
+        self.log_handler.setLevel(logging.INFO)
+        self.log_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        self.logger.addHandler(self.log_handler)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _on_close(self):
+        """
+        关闭窗口前卸载日志 Handler 并刷新剩余日志。
+        """
+        self.logger.removeHandler(self.log_handler)
+        self.log_handler.close()
+        self.destroy()
 
     def _build_ui(self):
         """
@@ -188,39 +229,35 @@ class App(tk.Tk):
         output_filename = f"{self.output_name.get().strip()}.{self.output_format.get()}"
         output_path = os.path.join("output", output_filename)
 
+        # Tk 变量只能在主线程读取，先取好参数快照再交给工作线程
+        options = dict(
+            inputs=list(self.input_files),
+            output=output_path,
+            merge_mode=self.merge_mode.get(),
+            use_voice=self.use_voice.get(),
+            voice_path=self.voice_file.get(),
+            voice_text_file=self.text_file.get(),
+            voice_mix_mode=self.voice_mix_mode.get(),
+            tts_voice=self.tts_voice.get(),
+            output_format=self.output_format.get(),
+        )
         self.btn_start.config(state=tk.DISABLED)
-        thread = threading.Thread(
-            target=self._run_task,
-            args=(
-                output_path,
-            ),
-            daemon=True,
+        self.after_idle(
+            lambda: threading.Thread(target=self._run_task, args=(options,), daemon=True).start()
         )
-        thread.start()
 
-    def _run_task(self, output_path: str):
+    def _run_task(self, options: dict):
         """
-        线程内执行合成，并在完成后恢复按钮。
+        线程内执行合成；界面更新统一通过 after 回到主线程。
         """
         try:
-            run_pipeline(
-                inputs=self.input_files,
-                output=output_path,
-                merge_mode=self.merge_mode.get(),
-                use_voice=self.use_voice.get(),
-                voice_path=self.voice_file.get(),
-                voice_text_file=self.text_file.get(),
-                voice_mix_mode=self.voice_mix_mode.get(),
-                tts_voice=self.tts_voice.get(),
-                output_format=self.output_format.get(),
-                logger=self.logger,
-            )
-            messagebox.showinfo("完成", f"合成完成，输出：{output_path}")
+            run_pipeline(logger=self.logger, **options)
+            self.after(0, lambda: messagebox.showinfo("完成", f"合成完成，输出：{options['output']}"))
         except Exception as exc:  # pylint: disable=broad-except
             self.logger.exception("合成失败：%s", exc)
-            messagebox.showerror("错误", f"处理失败：{exc}")
+            self.after(0, lambda err=exc: messagebox.showerror("错误", f"处理失败：{err}"))
         finally:
-            self.btn_start.config(state=tk.NORMAL)
+            self.after(0, lambda: self.btn_start.config(state=tk.NORMAL))
 
     def open_output_dir(self):
         """
@@ -231,8 +268,10 @@ class App(tk.Tk):
         try:
             if os.name == "nt":
                 os.startfile(output_dir)  # type: ignore[attr-defined]
+            elif sys.platform == "darwin":
+                subprocess.Popen(["open", output_dir], start_new_session=True)
             else:
-                os.system(f'xdg-open "{output_dir}"')
+                subprocess.Popen(["xdg-open", output_dir], start_new_session=True)
         except Exception as exc:  # pylint: disable=broad-except
             messagebox.showerror("错误", f"无法打开目录：{exc}")
 
@@ -9,12 +9,14 @@ from merger.utils import ensure_directories, setup_logging, adjust_output_path_e
 from merger.video_merge import merge_videos, export_video_clip
 from merger.voiceover import prepare_voice_audio, apply_voice_to_video
 
+_TRUTHY = frozenset({"1", "true", "t", "yes", "y"})
+
 
 def str2bool(value: str) -> bool:
     """
     Parse string into boolean, accepting common truthy values.
     """
-    return str(value).lower() in {"1", "true", "t", "yes", "y"}
+    return str(value).lower() in _TRUTHY
 
 
 def parse_args() -> argparse.Namespace:
@@ -118,9 +120,11 @@ def run_pipeline(
     trim_modes: Optional[List[str]] = None,
     tail_image_path: str = "",
     tail_duration: float = 0.0,
+    voice_text: str = "",
 ) -> str:
     """
     Execute the end-to-end merge and optional voiceover flow.
+    voice_text, when given, is synthesized directly instead of reading voice_text_file.
     """
     ensure_directories()
     logger = logger or setup_logging()
@@ -138,6 +142,7 @@ def run_pipeline(
             trim_modes=trim_modes,
             tail_image_path=tail_image_path,
             tail_duration=tail_duration,
+            stream_copy=not use_voice,
         )
 
         if use_voice:
@@ -147,6 +152,7 @@ def run_pipeline(
                 text_file=voice_text_file,
                 tts_voice=tts_voice,
                 logger=logger,
+                text=voice_text,
             )
             if voice_audio:
                 merged_clip, temp_audio = apply_voice_to_video(
@@ -1,12 +1,26 @@
 """
 S3/TOS storage helpers for uploading files and generating presigned URLs.
 """
+import base64
+import datetime
+import functools
 import mimetypes
 import os
-from typing import Optional
+from typing import Dict, Optional
 
 import boto3
+from boto3.s3.transfer import S3Transfer, TransferConfig
 from botocore.client import Config
+from botocore.exceptions import ClientError
+from botocore.signers import CloudFrontSigner
+
+# Multipart settings for large merged videos: 8 MB parts uploaded in parallel.
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    use_threads=True,
+    max_concurrency=8,
+)
 
 
 def storage_enabled() -> bool:
@@ -18,21 +32,45 @@ def storage_enabled() -> bool:
 
 
 def _client():
-    endpoint = os.getenv("S3_ENDPOINT")
-    region = os.getenv("S3_REGION")
-    access_key = os.getenv("S3_ACCESS_KEY")
-    secret_key = os.getenv("S3_SECRET_KEY")
-    addressing = os.getenv("S3_ADDRESSING_STYLE", "virtual")
+    return _client_cached(
+        os.getenv("S3_ENDPOINT"),
+        os.getenv("S3_REGION"),
+        os.getenv("S3_ACCESS_KEY"),
+        os.getenv("S3_SECRET_KEY"),
+        os.getenv("S3_ADDRESSING_STYLE", "virtual"),
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _client_cached(
+    endpoint: Optional[str],
+    region: Optional[str],
+    access_key: Optional[str],
+    secret_key: Optional[str],
+    addressing: str,
+):
+    # Client construction loads endpoint data and TLS contexts; reuse it per config tuple.
     return boto3.client(
         "s3",
         endpoint_url=endpoint,
         aws_access_key_id=access_key,
         aws_secret_access_key=secret_key,
         region_name=region,
-        config=Config(s3={"addressing_style": addressing}),
+        config=Config(
+            s3={"addressing_style": addressing},
+            max_pool_connections=50,
+            tcp_keepalive=True,
+            retries={"max_attempts": 3, "mode": "standard"},
+        ),
     )
 
 
+@functools.lru_cache(maxsize=4)
+def _transfer(client) -> S3Transfer:
+    # One transfer manager per cached client so its worker pool is reused across uploads.
+    return S3Transfer(client, config=_TRANSFER_CONFIG)
+
+
 def upload_file(local_path: str, bucket: str, key: str, content_type: Optional[str] = None, logger=None) -> str:
     if not storage_enabled():
         raise RuntimeError("Storage not configured")
@@ -45,13 +83,22 @@ def upload_file(local_path: str, bucket: str, key: str, content_type: Optional[s
         extra["ContentType"] = ctype
     if logger:
         logger.info("Uploading %s to %s/%s", local_path, bucket, key)
-    upload_kwargs = {}
-    if extra:
-        upload_kwargs["ExtraArgs"] = extra
-    client.upload_file(local_path, bucket, key, **upload_kwargs)
+    _transfer(client).upload_file(local_path, bucket, key, extra_args=extra or None)
     return f"s3://{bucket}/{key}"
 
 
+def object_exists(bucket: str, key: str) -> bool:
+    if not storage_enabled():
+        raise RuntimeError("Storage not configured")
+    try:
+        _client().head_object(Bucket=bucket, Key=key)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+    return True
+
+
 def presigned_url(bucket: str, key: str, expire_seconds: Optional[int] = None) -> str:
     if not storage_enabled():
         raise RuntimeError("Storage not configured")
@@ -62,3 +109,58 @@ def presigned_url(bucket: str, key: str, expire_seconds: Optional[int] = None) -
         Params={"Bucket": bucket, "Key": key},
         ExpiresIn=expires,
     )
+
+
+def cdn_enabled() -> bool:
+    return bool(
+        os.getenv("CDN_BASE_URL")
+        and os.getenv("CDN_KEY_PAIR_ID")
+        and os.getenv("CDN_PRIVATE_KEY_PATH")
+    )
+
+
+def cdn_url(key: str) -> str:
+    return f"{os.getenv('CDN_BASE_URL', '').rstrip('/')}/{key}"
+
+
+@functools.lru_cache(maxsize=2)
+def _cdn_signer(key_pair_id: str, private_key_path: str) -> CloudFrontSigner:
+    # cryptography is only needed when CDN signing is configured.
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    with open(private_key_path, "rb") as f:
+        private_key = serialization.load_pem_private_key(f.read(), password=None)
+
+    def rsa_signer(message: bytes) -> bytes:
+        return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
+
+    return CloudFrontSigner(key_pair_id, rsa_signer)
+
+
+def check_cdn_signer() -> None:
+    # Load the signer eagerly so a missing cryptography package or unreadable key fails at boot,
+    # not on the first finished job.
+    _cdn_signer(os.getenv("CDN_KEY_PAIR_ID", ""), os.getenv("CDN_PRIVATE_KEY_PATH", ""))
+
+
+def _cdn_b64(data: bytes) -> str:
+    # CloudFront's URL-safe base64 variant.
+    return base64.b64encode(data).decode("ascii").replace("+", "-").replace("=", "_").replace("/", "~")
+
+
+def cdn_signed_cookies(resource: str, expire_seconds: Optional[int] = None) -> Dict[str, str]:
+    # Custom-policy CloudFront cookies for a resource pattern (e.g. https://cdn/output/<job>/*);
+    # the object URL itself stays stable, so browsers and the CDN can cache it.
+    if not cdn_enabled():
+        raise RuntimeError("CDN signing not configured")
+    key_pair_id = os.getenv("CDN_KEY_PAIR_ID", "")
+    signer = _cdn_signer(key_pair_id, os.getenv("CDN_PRIVATE_KEY_PATH", ""))
+    expires = expire_seconds or int(os.getenv("OUTPUT_URL_EXPIRE_SECONDS", "86400"))
+    date_less_than = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires)
+    policy = signer.build_policy(resource, date_less_than).encode("utf-8")
+    return {
+        "CloudFront-Policy": _cdn_b64(policy),
+        "CloudFront-Signature": _cdn_b64(signer.rsa_signer(policy)),
+        "CloudFront-Key-Pair-Id": key_pair_id,
+    }
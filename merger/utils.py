@@ -1,21 +1,36 @@
 """
 通用工具函数：目录创建、日志、音频读写与长度处理。
 """
+import atexit
+import functools
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
+import subprocess
+import threading
 import tempfile
 import warnings
+import wave
 from typing import Optional
 
-# 优先配置 ffmpeg 路径，再导入 pydub，避免导入时找不到 ffmpeg 的警告
-try:
-    import imageio_ffmpeg
+import numpy as np
 
-    _ffmpeg_bin = imageio_ffmpeg.get_ffmpeg_exe()
+# 优先配置 ffmpeg 路径，再导入 pydub，避免导入时找不到 ffmpeg 的警告
+# 已通过 FFMPEG_BINARY 指定可用路径时直接使用，不再导入 imageio_ffmpeg
+_ffmpeg_bin = os.environ.get("FFMPEG_BINARY")
+if _ffmpeg_bin and os.path.isfile(_ffmpeg_bin):
     os.environ.setdefault("IMAGEIO_FFMPEG_EXE", _ffmpeg_bin)
-    os.environ.setdefault("FFMPEG_BINARY", _ffmpeg_bin)
-except Exception:
-    _ffmpeg_bin = None
+else:
+    try:
+        import imageio_ffmpeg
+
+        _ffmpeg_bin = imageio_ffmpeg.get_ffmpeg_exe()
+        os.environ.setdefault("IMAGEIO_FFMPEG_EXE", _ffmpeg_bin)
+        os.environ.setdefault("FFMPEG_BINARY", _ffmpeg_bin)
+    except Exception:  # pylint: disable=broad-except
+        _ffmpeg_bin = None
 
 # 抑制 pydub 在探测 ffmpeg 时的冗余警告
 warnings.filterwarnings(
@@ -40,9 +55,137 @@ def ensure_directories(log_dir: str = "logs", output_dir: str = "output", upload
         os.makedirs(upload_dir, exist_ok=True)
 
 
+_TMPFS_ROOT = "/dev/shm"
+_TMPFS_MIN_FREE_BYTES = 512 * 1024 * 1024
+
+
+def get_temp_dir() -> str:
+    """
+    返回临时音频文件目录：Linux 下 /dev/shm 可写且剩余空间充足时使用内存盘，
+    否则回退系统临时目录；设置 MERGE_TMPFS=0 可关闭。
+    """
+    if os.environ.get("MERGE_TMPFS", "1") != "0" and os.access(_TMPFS_ROOT, os.W_OK):
+        try:
+            if shutil.disk_usage(_TMPFS_ROOT).free >= _TMPFS_MIN_FREE_BYTES:
+                path = os.path.join(_TMPFS_ROOT, "video_merge_voiceover")
+                os.makedirs(path, exist_ok=True)
+                return path
+        except OSError:
+            pass
+    return tempfile.gettempdir()
+
+
+@functools.lru_cache(maxsize=None)
+def get_ffmpeg_binary() -> str:
+    """
+    返回可用的 ffmpeg 可执行文件路径，优先使用 imageio-ffmpeg 自带版本。
+    结果在进程内缓存，回退到 PATH 时只查找一次，后续子进程直接使用绝对路径。
+    """
+    binary = _ffmpeg_bin or os.environ.get("FFMPEG_BINARY") or "ffmpeg"
+    return shutil.which(binary) or binary
+
+
+@functools.lru_cache(maxsize=None)
+def get_ffprobe_binary() -> Optional[str]:
+    """
+    返回 ffprobe 可执行文件路径：优先 FFPROBE_BINARY，其次与 ffmpeg 同目录，最后查找 PATH；
+    imageio-ffmpeg 不附带 ffprobe，均找不到时返回 None。
+    """
+    configured = os.environ.get("FFPROBE_BINARY")
+    if configured and os.path.isfile(configured):
+        return configured
+    ffmpeg = get_ffmpeg_binary()
+    name = "ffprobe.exe" if ffmpeg.lower().endswith(".exe") else "ffprobe"
+    sibling = os.path.join(os.path.dirname(ffmpeg), name)
+    if os.path.dirname(ffmpeg) and os.path.isfile(sibling):
+        return sibling
+    return shutil.which("ffprobe")
+
+
+# 日志文件滚动：单个文件上限 5 MB，保留 3 个历史文件
+_LOG_MAX_BYTES = 5 * 1024 * 1024
+_LOG_BACKUP_COUNT = 3
+
+
+class BufferedFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    带 64 KB 写缓冲的滚动文件 Handler：ERROR 及以上立即落盘，其余记录最多延迟 flush_interval 秒批量写出。
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        mode: str = "a",
+        max_bytes: int = 0,
+        backup_count: int = 0,
+        encoding: Optional[str] = None,
+        buffer_size: int = 65536,
+        flush_interval: float = 1.0,
+    ):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._dirty = False
+        self._flusher: Optional[threading.Thread] = None
+        self._stop_flusher = threading.Event()
+        self._bytes_written = 0
+        super().__init__(filename, mode=mode, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+
+    def _open(self):
+        try:
+            self._bytes_written = os.path.getsize(self.baseFilename)
+        except OSError:
+            self._bytes_written = 0
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size, encoding=self.encoding, errors=self.errors)
+
+    def shouldRollover(self, record) -> bool:
+        # 用已写字节数判断是否滚动；基类的 stream.tell() 会强制刷新缓冲
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        # 按编码后的字节数计算：中文在 UTF-8 下每字 3 字节，按字符数会让文件超出上限
+        size = len((self.format(record) + self.terminator).encode(self.encoding or "utf-8", errors="replace"))
+        return 0 < self._bytes_written and self._bytes_written + size >= self.maxBytes
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            text = self.format(record) + self.terminator
+            self.stream.write(text)
+            self._bytes_written += len(text.encode(self.encoding or "utf-8", errors="replace"))
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        if record.levelno >= logging.ERROR:
+            self.flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        self._dirty = True
+        if self._flusher is None:
+            # 整个生命周期只启动一个后台刷新线程，而不是每个刷新周期新建一个 Timer 线程
+            self._flusher = threading.Thread(target=self._flush_loop, name="log-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop_flusher.wait(self.flush_interval):
+            if self._dirty:
+                self._dirty = False
+                self.flush()
+
+    def close(self):
+        self._stop_flusher.set()
+        super().close()
+
+
 def setup_logging(log_dir: str = "logs") -> logging.Logger:
     """
     配置全局日志，普通日志写入 app.log，错误写入 error.log，并同步输出到控制台。
+    各 Handler 由后台 QueueListener 线程写出，业务线程记录日志时只做入队。
     """
     ensure_directories(log_dir=log_dir)
     logger = logging.getLogger("video_merge_voiceover")
@@ -51,24 +194,47 @@ def setup_logging(log_dir: str = "logs") -> logging.Logger:
     if logger.handlers:
         return logger  # 避免重复添加处理器
 
-    # 普通日志
-    info_handler = logging.FileHandler(os.path.join(log_dir, "app.log"), encoding="utf-8")
+    file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+    # 普通日志：带缓冲写出，INFO 记录只做用户态拷贝
+    info_handler = BufferedFileHandler(
+        os.path.join(log_dir, "app.log"),
+        max_bytes=_LOG_MAX_BYTES,
+        backup_count=_LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
     info_handler.setLevel(logging.INFO)
-    info_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    info_handler.setFormatter(file_formatter)
 
-    # 错误日志
-    error_handler = logging.FileHandler(os.path.join(log_dir, "error.log"), encoding="utf-8")
+    # 错误日志：延迟到首条错误记录时才打开文件
+    error_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, "error.log"),
+        maxBytes=_LOG_MAX_BYTES,
+        backupCount=_LOG_BACKUP_COUNT,
+        encoding="utf-8",
+        delay=True,
+    )
     error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    error_handler.setFormatter(file_formatter)
 
     # 控制台输出
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
 
-    logger.addHandler(info_handler)
-    logger.addHandler(error_handler)
-    logger.addHandler(console_handler)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue,
+        info_handler,
+        error_handler,
+        console_handler,
+        respect_handler_level=True,
+    )
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger._queue_listener = listener  # type: ignore[attr-defined]  # 保持引用，避免被回收
     logger.propagate = False
 
     return logger
@@ -94,6 +260,10 @@ def load_audio_segment(path: str, logger: Optional[logging.Logger] = None) -> Op
     if not os.path.exists(path):
         logger.error("音频文件不存在：%s", path)
         return None
+    try:
+        return _fast_load_audio_segment(path)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning("ffmpeg 直接解码失败，改用 pydub 加载：%s", exc)
     try:
         return AudioSegment.from_file(path)
     except Exception as exc:  # pylint: disable=broad-except
@@ -101,6 +271,55 @@ def load_audio_segment(path: str, logger: Optional[logging.Logger] = None) -> Op
         return None
 
 
+def read_wav_segment(path: str) -> AudioSegment:
+    """
+    用标准库 wave 直接读取 PCM WAV，不启动 ffmpeg；非 PCM WAV 抛出 wave.Error。
+    """
+    with wave.open(path, "rb") as wf:
+        data = wf.readframes(wf.getnframes())
+        return AudioSegment(
+            data=data,
+            sample_width=wf.getsampwidth(),
+            frame_rate=wf.getframerate(),
+            channels=wf.getnchannels(),
+        )
+
+
+def _fast_load_audio_segment(path: str, frame_rate: int = 44100, channels: int = 2) -> AudioSegment:
+    """
+    让 ffmpeg 直接把音频解码为 s16le PCM 写到管道，省去 pydub 的临时 WAV 与头解析。
+    统一重采样到固定采样率/声道，无需额外探测源格式。
+    """
+    cmd = [
+        get_ffmpeg_binary(),
+        "-v",
+        "quiet",
+        "-i",
+        path,
+        "-vn",
+        "-f",
+        "s16le",
+        "-acodec",
+        "pcm_s16le",
+        "-ac",
+        str(channels),
+        "-ar",
+        str(frame_rate),
+        "pipe:1",
+    ]
+    chunks = []
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+        while True:
+            chunk = proc.stdout.read(1 << 20)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        returncode = proc.wait()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg 退出码 {returncode}")
+    return AudioSegment(data=b"".join(chunks), sample_width=2, frame_rate=frame_rate, channels=channels)
+
+
 def pad_or_trim_audio(audio: AudioSegment, target_duration_ms: int, logger: Optional[logging.Logger] = None) -> AudioSegment:
     """
     将音频补齐或裁剪到目标时长；不足时先淡出再补静音，避免瞬时静音。
@@ -110,20 +329,121 @@ def pad_or_trim_audio(audio: AudioSegment, target_duration_ms: int, logger: Opti
     if current_duration < target_duration_ms:
         padding = target_duration_ms - current_duration
         fade_ms = min(1000, current_duration)
-        audio_faded = audio.fade_out(fade_ms)
         logger.info("音频时长不足，尾部淡出 %d ms，补齐静音 %d ms。", fade_ms, padding)
-        return audio_faded + AudioSegment.silent(duration=padding)
+        if audio.sample_width not in _PCM_DTYPES:
+            return audio.fade_out(fade_ms) + create_silent_audio(padding, frame_rate=audio.frame_rate)
+        return _fade_out_and_pad_pcm(audio, fade_ms, target_duration_ms)
     if current_duration > target_duration_ms:
         logger.info("音频时长过长，裁剪到目标时长 %d ms。", target_duration_ms)
         return audio[:target_duration_ms]
     return audio
 
 
-def create_silent_audio(duration_ms: int) -> AudioSegment:
+# 可直接用 NumPy 处理的有符号 PCM 位宽（8 位为无符号、24 位无原生 dtype，仍走 pydub）
+_PCM_DTYPES = {2: np.int16, 4: np.int32}
+
+
+def _fade_out_and_pad_pcm(audio: AudioSegment, fade_ms: int, target_duration_ms: int) -> AudioSegment:
+    """
+    有符号 PCM 的淡出 + 补静音：一次分配目标长度缓冲，用 NumPy 线性包络处理尾部。
+    """
+    dtype = _PCM_DTYPES[audio.sample_width]
+    work_dtype = np.float32 if dtype is np.int16 else np.float64
+    channels = audio.channels
+    samples = np.frombuffer(audio.raw_data, dtype=dtype).reshape(-1, channels)
+    count = len(samples)
+    total = max(int(target_duration_ms * audio.frame_rate / 1000), count)
+    out = np.zeros((total, channels), dtype=dtype)
+    out[:count] = samples
+    fade_samples = min(count, int(fade_ms * audio.frame_rate / 1000))
+    if fade_samples > 0:
+        envelope = np.linspace(1.0, 0.0, fade_samples, dtype=work_dtype)[:, None]
+        tail = out[count - fade_samples:count]
+        tail[...] = (tail.astype(work_dtype) * envelope).astype(dtype)
+    return audio._spawn(out.tobytes())  # pylint: disable=protected-access
+
+
+def audiosegment_to_float_array(audio: AudioSegment) -> np.ndarray:
+    """
+    将 AudioSegment 转为 MoviePy 使用的 float32 采样数组，形状为 (采样数, 声道数)，取值 [-1, 1)。
+    """
+    audio = audio.set_sample_width(2)
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16).reshape(-1, audio.channels)
+    arr = samples.astype(np.float32)
+    arr /= 32768.0  # 原地缩放，避免整段音轨再多一份 float32 临时数组
+    return arr
+
+
+_GAIN_SHIFT = 15
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_mix_kernel():
+    """
+    设置 MERGE_NUMBA=1 且安装了 numba 时，在首次混音时才编译多线程 JIT 内核；否则返回 None 走 NumPy。
+    放在首次调用而非导入时，避免不混音的 CLI/GUI/Web 进程承担 JIT 与线程层的启动开销。
+    """
+    if os.environ.get("MERGE_NUMBA", "0") != "1":
+        return None
+    try:  # numba 为可选依赖
+        import numba  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: no cover - 可选依赖
+        return None
+
+    @numba.njit(parallel=True, fastmath=True)
+    def _mix_i16(a, b, a_num, b_num, out):  # pragma: no cover - JIT 编译
+        for i in numba.prange(a.shape[0]):
+            v = ((np.int32(a[i]) * a_num) >> _GAIN_SHIFT) + ((np.int32(b[i]) * b_num) >> _GAIN_SHIFT)
+            if v > 32767:
+                v = 32767
+            elif v < -32768:
+                v = -32768
+            out[i] = v
+
+    return _mix_i16
+
+
+def mix_audio_segments(base: AudioSegment, overlay: AudioSegment, base_gain: float, overlay_gain: float) -> AudioSegment:
     """
-    创建指定时长的静音音频。
+    按线性增益混合两段音频，结果截到两者中较短的长度。
+    增益转为 Q15 定点整数，在 int32 上完成缩放、叠加与饱和截断，不经过浮点；
+    设置 MERGE_NUMBA=1 且安装了 numba 时使用多线程 JIT 内核，省去中间 int32 数组。
     """
-    return AudioSegment.silent(duration=duration_ms)
+    base = base.set_sample_width(2)
+    overlay = overlay.set_sample_width(2).set_frame_rate(base.frame_rate).set_channels(base.channels)
+    a = np.frombuffer(base.raw_data, dtype=np.int16)
+    b = np.frombuffer(overlay.raw_data, dtype=np.int16)
+    n = min(len(a), len(b))
+    base_num = int(round(base_gain * (1 << _GAIN_SHIFT)))
+    overlay_num = int(round(overlay_gain * (1 << _GAIN_SHIFT)))
+    kernel = _numba_mix_kernel()
+    if kernel is not None:
+        out = np.empty(n, dtype=np.int16)
+        kernel(a[:n], b[:n], base_num, overlay_num, out)
+        return base._spawn(out.tobytes())  # pylint: disable=protected-access
+    mix = (a[:n].astype(np.int32) * base_num) >> _GAIN_SHIFT
+    mix += (b[:n].astype(np.int32) * overlay_num) >> _GAIN_SHIFT
+    return base._spawn(np.clip(mix, -32768, 32767).astype(np.int16).tobytes())  # pylint: disable=protected-access
+
+
+# 静音默认格式与 ffmpeg 直接解码的音频一致（44.1kHz/双声道/16 位），混音时无需再转换
+_SILENT_RATE = 44100
+_SILENT_CHANNELS = 2
+_SILENT_WIDTH = 2
+
+
+def create_silent_audio(
+    duration_ms: int,
+    frame_rate: int = _SILENT_RATE,
+    channels: int = _SILENT_CHANNELS,
+    sample_width: int = _SILENT_WIDTH,
+) -> AudioSegment:
+    """
+    创建指定时长的静音音频：bytes(n) 由 calloc 分配零页，不逐采样构造。
+    """
+    n_samples = int(duration_ms * frame_rate / 1000.0)
+    data = bytes(n_samples * sample_width * channels)
+    return AudioSegment(data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
 
 
 def extract_audio_segment_from_clip(video_clip, logger: Optional[logging.Logger] = None) -> AudioSegment:
@@ -143,7 +463,14 @@ def extract_audio_segment_from_clip(video_clip, logger: Optional[logging.Logger]
         except Exception:  # pylint: disable=broad-except
             audio_clip.fps = 44100  # type: ignore[attr-defined]
 
-    fd, temp_path = tempfile.mkstemp(suffix=".wav")
+    try:
+        # 直接从内存读取采样构造 AudioSegment，省去写出 WAV 再解码的两次 ffmpeg 调用
+        audio_seg = _audio_clip_to_segment(audio_clip)
+        return pad_or_trim_audio(audio_seg, duration_ms, logger)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning("内存读取视频音频失败，改用临时 WAV：%s", exc)
+
+    fd, temp_path = tempfile.mkstemp(suffix=".wav", dir=get_temp_dir())
     os.close(fd)
     try:
         # 静默导出音频以供 pydub 加载
@@ -157,20 +484,28 @@ def extract_audio_segment_from_clip(video_clip, logger: Optional[logging.Logger]
         safe_remove(temp_path, logger)
 
 
-def write_audiosegment_to_temp(audio: AudioSegment, suffix: str = ".wav", logger: Optional[logging.Logger] = None) -> str:
+def _audio_clip_to_segment(audio_clip, fps: int = 44100, chunksize: int = 50000) -> AudioSegment:
     """
-    将 AudioSegment 写入临时文件，返回路径。
+    分块读取 MoviePy 音频并量化为 16 位 PCM，直接构造 AudioSegment。
+    按已知时长一次性预分配 int16 缓冲，逐块写入，避免拼接字节串时的重复拷贝。
     """
-    logger = logger or logging.getLogger("video_merge_voiceover")
-    fd, temp_path = tempfile.mkstemp(suffix=suffix)
-    os.close(fd)
-    try:
-        audio.export(temp_path, format=suffix.replace(".", ""))
-        return temp_path
-    except Exception as exc:  # pylint: disable=broad-except
-        logger.exception("写入临时音频失败：%s", exc)
-        safe_remove(temp_path, logger)
-        raise
+    expected = int(fps * audio_clip.duration) if audio_clip.duration else 0
+    buf: Optional[np.ndarray] = None
+    offset = 0
+    for arr in audio_clip.iter_chunks(fps=fps, chunksize=chunksize):
+        arr = arr.reshape(len(arr), -1)
+        if buf is None:
+            buf = np.empty((max(expected, len(arr)), arr.shape[1]), dtype=np.int16)
+        end = offset + len(arr)
+        if end > len(buf):
+            # 实际采样多于预估（时长取整误差），扩展尾部
+            buf = np.concatenate([buf[:offset], np.empty((end - offset, buf.shape[1]), dtype=np.int16)])
+        # 自行饱和截断：moviepy 的 quantize 不做截断，混音后超出 [-1, 1] 会回绕
+        buf[offset:end] = np.clip(arr * 32767, -32768, 32767)
+        offset = end
+    if buf is None:
+        buf = np.zeros((0, getattr(audio_clip, "nchannels", None) or 2), dtype=np.int16)
+    return AudioSegment(data=buf[:offset].tobytes(), sample_width=2, frame_rate=fps, channels=buf.shape[1])
 
 
 def safe_remove(path: str, logger: Optional[logging.Logger] = None) -> None:
@@ -178,8 +513,11 @@ def safe_remove(path: str, logger: Optional[logging.Logger] = None) -> None:
     安全删除文件，不抛出异常。
     """
     logger = logger or logging.getLogger("video_merge_voiceover")
+    if not path:
+        return
     try:
-        if path and os.path.exists(path):
-            os.remove(path)
-    except Exception as exc:  # pylint: disable=broad-except
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as exc:
         logger.warning("删除临时文件失败 %s: %s", path, exc)
@@ -1,31 +1,350 @@
 """
 视频拼接相关逻辑。
 """
+import concurrent.futures
+import functools
+import json
 import os
-from typing import List, Tuple, Optional
+import re
+import subprocess
+import tempfile
+from typing import List, Tuple, Optional, Union
 
-# Pillow>=10 移除了 Image.ANTIALIAS，moviepy 仍有引用，这里先补齐再导入 moviepy
-try:  # pragma: no cover - 兼容性补丁
-    from PIL import Image as _PILImage
 
-    if not hasattr(_PILImage, "ANTIALIAS"):
-        _PILImage.ANTIALIAS = _PILImage.Resampling.LANCZOS
-except Exception:  # pylint: disable=broad-except
-    _PILImage = None
+def _patch_pil_antialias() -> None:
+    """
+    Pillow>=10 移除了 Image.ANTIALIAS，moviepy 仍有引用，需在导入 moviepy 前补齐。
+    """
+    try:  # pragma: no cover - 兼容性补丁
+        from PIL import Image  # pylint: disable=import-outside-toplevel
+
+        if not hasattr(Image, "ANTIALIAS"):
+            Image.ANTIALIAS = getattr(Image, "Resampling", Image).LANCZOS
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+
+_patch_pil_antialias()
+
+from moviepy.editor import VideoFileClip, concatenate_videoclips, ImageClip  # noqa: E402
+
+from merger.utils import (  # noqa: E402
+    adjust_output_path_extension,
+    get_ffmpeg_binary,
+    get_ffprobe_binary,
+    get_temp_dir,
+    safe_remove,
+)
+
+# 解析 `ffmpeg -i` 输出中的时长与音视频流参数
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_STREAM_RE = re.compile(
+    r"Stream #\d+:\d+.*?: Video: (?P<codec>\w+)(?: \((?P<profile>[^)]*)\))?[^,\n]*, (?P<pix>\w+)"
+    r"[^\n]*?, (?P<w>\d{2,5})x(?P<h>\d{2,5})(?: \[SAR (?P<sar>\d+:\d+) DAR \d+:\d+\])?"
+    r"(?:[^\n]*?, (?P<fps>[\d.]+k?) fps)?(?:[^\n]*?, (?P<tbn>[\d.]+k?) tbn)?"
+)
+_AUDIO_STREAM_RE = re.compile(
+    r"Stream #\d+:\d+.*?: Audio: (?P<codec>\w+)[^\n]*?, (?P<rate>\d+) Hz, (?P<layout>[^,\n]+)"
+)
+
+# 硬件编码器候选：(MERGE_HWENC 取值, 编码器名, preset, 额外 ffmpeg 参数)
+# MoviePy 以 rgb24 管道送帧且只对 libx264 追加 -pix_fmt yuv420p，硬件编码器需显式指定，
+# 否则可能协商出多数播放器无法解码的 4:4:4 输出；VAAPI 由 format=nv12 滤镜完成转换
+_HWENC_CANDIDATES = [
+    ("nvenc", "h264_nvenc", "p4", ["-b:v", "6M", "-pix_fmt", "yuv420p"]),
+    ("qsv", "h264_qsv", "medium", ["-pix_fmt", "yuv420p"]),
+    ("vaapi", "h264_vaapi", "medium", ["-vaapi_device", "/dev/dri/renderD128", "-vf", "format=nv12,hwupload"]),
+]
+
+
+class StreamCopyConcat:
+    """
+    模式 A 流拷贝拼接结果：仅记录待拼接文件清单，导出时由 ffmpeg concat demuxer 直接写出，不重新编码。
+    对外提供 duration 与 close()，便于与 MoviePy clip 一致地被流程使用；
+    duration 初始为各输入探测时长之和，写出后更新为对输出文件实际探测的时长。
+    """
+
+    def __init__(self, sources: List[str], duration: float, logger):
+        self.sources = sources
+        self.duration = duration
+        self.logger = logger
+        self._clips: List[VideoFileClip] = []
+
+        fd, self.list_path = tempfile.mkstemp(suffix=".txt", dir=get_temp_dir())
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for src in sources:
+                escaped = os.path.abspath(src).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+    def write_to(self, output_path: str) -> None:
+        """
+        调用 ffmpeg concat demuxer 以 -c copy 写出到目标路径，失败时抛出 RuntimeError。
+        """
+        cmd = [
+            get_ffmpeg_binary(),
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            self.list_path,
+            "-c",
+            "copy",
+            *_container_params(output_path),
+            output_path,
+        ]
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+        if proc.returncode != 0:
+            detail = proc.stderr.decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"ffmpeg 流拷贝拼接失败：{detail[-500:]}")
+        probed = _probe_media(output_path)["duration"]
+        if probed:
+            self.duration = probed
+
+    def to_clip(self):
+        """
+        回退为 MoviePy 拼接结果，供流拷贝失败时重新编码使用。
+        """
+        self._clips = [VideoFileClip(src) for src in self.sources]
+        return concatenate_videoclips(self._clips, method="compose")
+
+    def close(self) -> None:
+        for clip in self._clips:
+            clip.close()
+        self._clips = []
+        safe_remove(self.list_path, self.logger)
+
+
+def _probe_media(path: str) -> dict:
+    """
+    通过 `ffmpeg -i` 读取时长与首个音视频流参数，不解码任何帧。
+    """
+    proc = subprocess.run(
+        [get_ffmpeg_binary(), "-hide_banner", "-i", path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=False,
+    )
+    text = proc.stderr.decode("utf-8", errors="replace")
+    if "No such file or directory" in text:
+        raise FileNotFoundError(f"输入视频不存在：{path}")
+    info = {"duration": None, "video": None, "audio": None}
+    match = _DURATION_RE.search(text)
+    if match:
+        hours, minutes, seconds = match.groups()
+        info["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    match = _VIDEO_STREAM_RE.search(text)
+    if match:
+        info["video"] = match.group("codec", "profile", "pix", "w", "h", "sar", "fps", "tbn")
+    match = _AUDIO_STREAM_RE.search(text)
+    if match:
+        info["audio"] = match.group("codec", "rate", "layout")
+    return info
+
+
+def _probe_stream_params(path: str) -> Optional[dict]:
+    """
+    用 ffprobe 读取 `ffmpeg -i` 不显示、但流拷贝拼接同样要求一致的参数：
+    视频的 time_base / level / extradata（SPS/PPS）哈希与音频的 time_base / extradata 哈希。
+    没有 ffprobe 或探测失败时返回 None。
+    """
+    ffprobe = get_ffprobe_binary()
+    if not ffprobe:
+        return None
+    cmd = [
+        ffprobe,
+        "-v",
+        "error",
+        "-show_data_hash",
+        "sha256",
+        "-show_entries",
+        "stream=codec_type,time_base,sample_aspect_ratio,level,extradata_hash",
+        "-of",
+        "json",
+        path,
+    ]
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False, timeout=30)
+        streams = json.loads(proc.stdout or b"{}").get("streams", [])
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+    if proc.returncode != 0:
+        return None
+    params = {"video": None, "audio": None}
+    for stream in streams:
+        kind = stream.get("codec_type")
+        if kind == "video" and params["video"] is None:
+            params["video"] = tuple(
+                stream.get(key) for key in ("time_base", "sample_aspect_ratio", "level", "extradata_hash")
+            )
+        elif kind == "audio" and params["audio"] is None:
+            params["audio"] = (stream.get("time_base"), stream.get("extradata_hash"))
+    return params
+
+
+def _probe_concat_signature(path: str) -> Tuple[dict, Optional[tuple]]:
+    """
+    返回 (时长等基础信息, 流拷贝拼接签名)；任一必需字段缺失时签名为 None。
+    """
+    info = _probe_media(path)
+    video = info["video"]
+    # SAR 未知时 ffmpeg 不打印，允许为空；其余字段缺失说明解析不全，不能判定可以流拷贝
+    if not video or not info["duration"] or any(video[i] is None for i in (0, 2, 3, 4, 6, 7)):
+        return info, None
+    params = _probe_stream_params(path)
+    if not params or not params["video"] or any(field is None for field in params["video"]):
+        return info, None
+    if info["audio"] and (not params["audio"] or params["audio"][0] is None):
+        return info, None
+    return info, (video, info["audio"], params["video"], params["audio"])
+
+
+@functools.lru_cache(maxsize=None)
+def _list_ffmpeg_encoders() -> str:
+    """
+    读取 `ffmpeg -encoders` 输出（进程内只执行一次）。
+    """
+    try:
+        proc = subprocess.run(
+            [get_ffmpeg_binary(), "-hide_banner", "-encoders"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=False,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return proc.stdout.decode("utf-8", errors="replace")
+
+
+def _hwenc_usable(codec: str, preset: str, params: List[str]) -> bool:
+    """
+    编码器被编译进 ffmpeg 不代表有对应硬件，这里用极小的测试画面实际编码一次确认。
+    测试画面与 MoviePy 导出一致为 rgb24，编码参数与导出时相同（MoviePy 总会传入 -preset），
+    确保探测通过即代表真实导出命令可用。
+    """
+    cmd = [
+        get_ffmpeg_binary(),
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        "color=c=black:s=256x256:d=0.1,format=rgb24",
+        "-frames:v",
+        "1",
+        "-vcodec",
+        codec,
+        "-preset",
+        preset,
+        *params,
+        "-f",
+        "null",
+        "-",
+    ]
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False, timeout=15)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return proc.returncode == 0
+
+
+# 软件编码（默认及硬件编码失败时的回退）：(codec, preset, ffmpeg 参数)
+_SOFTWARE_ENCODER = ("libx264", "veryfast", ("-x264-params", "threads=auto"))
+
+
+@functools.lru_cache(maxsize=None)
+def _pick_video_codec() -> Tuple[str, str, Tuple[str, ...]]:
+    """
+    按环境变量 MERGE_HWENC（auto/off/nvenc/qsv/vaapi）选择视频编码器，返回 (codec, preset, ffmpeg 参数)。
+    """
+    choice = os.environ.get("MERGE_HWENC", "auto").strip().lower()
+    if choice == "off":
+        return _SOFTWARE_ENCODER
+    encoders = _list_ffmpeg_encoders()
+    for name, codec, preset, params in _HWENC_CANDIDATES:
+        if choice not in ("auto", name):
+            continue
+        if re.search(rf"\b{codec}\b", encoders) and _hwenc_usable(codec, preset, params):
+            return codec, preset, tuple(params)
+    return _SOFTWARE_ENCODER
+
+
+def _container_params(output_path: str) -> List[str]:
+    """
+    MP4/MOV 输出把 moov 移到文件头，便于边下边播。
+    """
+    if os.path.splitext(output_path)[1].lower() in (".mp4", ".mov"):
+        return ["-movflags", "+faststart"]
+    return []
+
+
+def _resolve_trim_window(
+    duration: float,
+    trim_seconds: Optional[float],
+    trim_mode: str,
+    logger,
+) -> Optional[Tuple[float, float]]:
+    """
+    计算裁剪区间 (start, end)，未设置裁剪时返回 None。
+    """
+    if trim_seconds is None or trim_seconds <= 0:
+        return None
+    duration = duration or 0
+    actual = min(trim_seconds, duration)
+    if trim_seconds > duration:
+        logger.warning("裁剪秒数 %.2f 超出视频时长 %.2f，已自动截到视频末尾", trim_seconds, duration)
+    if str(trim_mode or "").lower() == "end":
+        logger.info("截取视频末尾%.2f 秒", actual)
+        return max(duration - actual, 0), duration
+    logger.info("截取视频前%.2f 秒", actual)
+    return 0, actual
+
 
-from moviepy.editor import VideoFileClip, concatenate_videoclips, ImageClip
-# 再次确保 ANTIALIAS 存在（有些环境在导入 moviepy 前未补丁到位）
-try:  # pragma: no cover - 兼容性补丁
-    from PIL import Image as _PILImage2
+def _try_stream_copy_concat(
+    input_paths: List[str],
+    trims: List[float],
+    logger,
+) -> Optional[StreamCopyConcat]:
+    """
+    所有输入编码参数一致且未设置裁剪时走流拷贝拼接；否则返回 None 交由 MoviePy 重新编码。
+    -c copy 只能在关键帧处切分，裁剪点无法精确落在指定秒数，因此有裁剪时不走流拷贝。
+    """
+    if os.environ.get("MERGE_STREAM_COPY", "1") == "0":
+        return None
+    if any(trim_val is not None and trim_val > 0 for trim_val in trims[: len(input_paths)]):
+        logger.info("设置了裁剪，流拷贝无法精确切分，使用 MoviePy 重新编码拼接。")
+        return None
+    if not get_ffprobe_binary():
+        # 没有 ffprobe 无法比对 level/extradata，注定回退重新编码，不必再逐个启动探测进程
+        logger.info("未找到 ffprobe，无法校验流拷贝条件，使用 MoviePy 重新编码拼接。")
+        return None
 
-    if not hasattr(_PILImage2, "ANTIALIAS"):
-        resampling = getattr(_PILImage2, "Resampling", None)
-        fallback = getattr(resampling, "LANCZOS", None) if resampling else None
-        _PILImage2.ANTIALIAS = fallback or getattr(_PILImage2, "BICUBIC", None) or _PILImage2.NEAREST
-except Exception:  # pylint: disable=broad-except
-    pass
+    if len(input_paths) <= 2:
+        probes = [_probe_concat_signature(path) for path in input_paths]
+    else:
+        # 每个探测都是独立的 ffmpeg/ffprobe 进程 + 文件读取，网络盘上并行可隐藏往返延迟
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(32, len(input_paths))) as executor:
+            probes = list(executor.map(_probe_concat_signature, input_paths))
+    infos = [info for info, _ in probes]
+    signatures = {signature for _, signature in probes}
+    if None in signatures:
+        logger.info("无法完整探测输入的编码参数，使用 MoviePy 重新编码拼接。")
+        return None
+    if len(signatures) != 1:
+        logger.info("输入视频编码参数不一致，使用 MoviePy 重新编码拼接。")
+        return None
 
-from merger.utils import adjust_output_path_extension
+    for path in input_paths:
+        logger.info("加载视频：%s", path)
+    total = sum(info["duration"] for info in infos)
+    logger.info("输入编码参数一致，使用 ffmpeg 流拷贝拼接（不重新编码）。")
+    return StreamCopyConcat(list(input_paths), total, logger)
 
 
 def _calculate_target_resolution(clips: List[VideoFileClip], merge_mode: str) -> Tuple[int, int]:
@@ -50,20 +369,25 @@ def _trim_clip_if_needed(
     """
     若提供裁剪秒数，可选择截取开头或末尾的指定时长。
     """
-    if trim_seconds is None or trim_seconds <= 0:
+    window = _resolve_trim_window(clip.duration, trim_seconds, trim_mode, logger)
+    if window is None:
         return clip
-    duration = clip.duration or 0
-    actual = min(trim_seconds, duration)
-    if trim_seconds > duration:
-        logger.warning("裁剪秒数 %.2f 超出视频时长 %.2f，已自动截到视频末尾", trim_seconds, duration)
-    use_end = str(trim_mode or "").lower() == "end"
-    if use_end:
-        start = max(duration - actual, 0)
-        end = duration
-        logger.info("截取视频末尾%.2f 秒", actual)
-        return clip.subclip(start, end)
-    logger.info("截取视频前%.2f 秒", actual)
-    return clip.subclip(0, actual)
+    return clip.subclip(*window)
+
+
+def _load_and_trim(path: str, trim_val: Optional[float], trim_mode: str, logger) -> VideoFileClip:
+    """
+    校验并加载单个视频，按需裁剪。
+    """
+    logger.info("加载视频：%s", path)
+    try:
+        clip = VideoFileClip(path)
+    except OSError as exc:
+        # moviepy 对不存在的文件抛出普通 IOError，这里统一转换为 FileNotFoundError
+        if isinstance(exc, FileNotFoundError) or "could not be found" in str(exc):
+            raise FileNotFoundError(f"输入视频不存在：{path}") from exc
+        raise
+    return _trim_clip_if_needed(clip, trim_val, trim_mode, logger)
 
 
 def merge_videos(
@@ -74,26 +398,46 @@ def merge_videos(
     trim_modes: Optional[List[str]] = None,
     tail_image_path: Optional[str] = None,
     tail_duration: Optional[float] = None,
-) -> VideoFileClip:
+    stream_copy: bool = False,
+) -> Union[VideoFileClip, StreamCopyConcat]:
     """
     按指定模式拼接多个视频，可选按序对每个视频裁剪前/后N秒，并可附加尾帧图片。
+    stream_copy 为 True 且模式 A 无尾帧时，尝试以 ffmpeg 流拷贝拼接，跳过整段重新编码。
     """
     if not input_paths:
         raise ValueError("必须提供至少一个输入视频。")
 
     trims = trims or []
     trim_modes = trim_modes or []
-    # 读取视频
+    wants_tail = bool(tail_image_path and tail_duration and tail_duration > 0)
+    if stream_copy and merge_mode == "A" and not wants_tail:
+        concat = _try_stream_copy_concat(input_paths, trims, logger)
+        if concat is not None:
+            return concat
+
+    # 并行读取视频（探测/打开主要耗在 ffmpeg 子进程与磁盘 I/O），按输入顺序收集结果
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(input_paths))) as executor:
+        futures = [
+            executor.submit(
+                _load_and_trim,
+                path,
+                trims[idx] if idx < len(trims) else None,
+                trim_modes[idx] if idx < len(trim_modes) else "start",
+                logger,
+            )
+            for idx, path in enumerate(input_paths)
+        ]
     clips: List[VideoFileClip] = []
-    for idx, path in enumerate(input_paths):
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"输入视频不存在：{path}")
-        logger.info("加载视频：%s", path)
-        clip = VideoFileClip(path)
-        trim_val = trims[idx] if idx < len(trims) else None
-        trim_mode = trim_modes[idx] if idx < len(trim_modes) else "start"
-        clip = _trim_clip_if_needed(clip, trim_val, trim_mode, logger)
-        clips.append(clip)
+    errors = []
+    for future in futures:
+        try:
+            clips.append(future.result())
+        except Exception as exc:  # pylint: disable=broad-except
+            errors.append(exc)
+    if errors:
+        for clip in clips:
+            clip.close()
+        raise errors[0]
 
     target_w, target_h = _calculate_target_resolution(clips, merge_mode)
     base_w = clips[0].w if clips else 0
@@ -109,7 +453,7 @@ def merge_videos(
             logger.info("调整分辨率为 (%s, %s)", target_w, target_h)
             processed.append(clip.resize(newsize=(target_w, target_h)))
 
-    if tail_image_path and tail_duration and tail_duration > 0:
+    if wants_tail:
         if not os.path.exists(tail_image_path):
             logger.warning("尾帧图片不存在：%s", tail_image_path)
         else:
@@ -121,24 +465,56 @@ def merge_videos(
                 tail_clip = tail_clip.set_fps(clips[0].fps)
             processed.append(tail_clip)
 
-    logger.info("开始拼接视频，模式：%s", merge_mode)
-    merged_clip = concatenate_videoclips(processed, method="compose")
+    # 尺寸全部一致时用 chain 直接顺序拼接，避免 compose 逐帧合成画布
+    same_size = all(tuple(clip.size) == (final_w, final_h) for clip in processed)
+    method = "chain" if same_size else "compose"
+    logger.info("开始拼接视频，模式：%s，拼接方式：%s", merge_mode, method)
+    merged_clip = concatenate_videoclips(processed, method=method)
     return merged_clip
 
 
-def export_video_clip(video_clip: VideoFileClip, output_path: str, output_format: str, logger) -> str:
+def export_video_clip(
+    video_clip: Union[VideoFileClip, StreamCopyConcat],
+    output_path: str,
+    output_format: str,
+    logger,
+) -> str:
     """
-    将 VideoClip 导出到指定路径。
+    将 VideoClip 导出到指定路径；流拷贝拼接结果直接由 ffmpeg 写出，失败时回退重新编码。
     """
     output_path = adjust_output_path_extension(output_path, output_format)
     os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
     logger.info("写出视频到 %s", output_path)
+    if isinstance(video_clip, StreamCopyConcat):
+        try:
+            video_clip.write_to(output_path)
+            return output_path
+        except RuntimeError as exc:
+            logger.warning("流拷贝拼接失败，回退 MoviePy 重新编码：%s", exc)
+            video_clip = video_clip.to_clip()
+    codec, preset, codec_params = _pick_video_codec()
+    if codec != _SOFTWARE_ENCODER[0]:
+        logger.info("使用硬件编码器：%s", codec)
+        try:
+            _write_videofile(video_clip, output_path, codec, preset, codec_params)
+            return output_path
+        except (IOError, OSError) as exc:
+            # 硬件编码可能在运行时失败（如 NVENC 并发会话数上限、驱动与参数不匹配），改用软件编码重试
+            logger.warning("硬件编码器 %s 导出失败，回退 %s：%s", codec, _SOFTWARE_ENCODER[0], exc)
+    _write_videofile(video_clip, output_path, *_SOFTWARE_ENCODER)
+    return output_path
+
+
+def _write_videofile(video_clip, output_path: str, codec: str, preset: str, codec_params: Tuple[str, ...]) -> None:
     video_clip.write_videofile(
         output_path,
-        codec="libx264",
+        codec=codec,
+        preset=preset,
         audio_codec="aac",
-        temp_audiofile="temp-audio.m4a",
+        # 按输出路径命名临时音轨，并发任务各写各的，互不覆盖或误删
+        temp_audiofile=f"{os.path.splitext(output_path)[0]}.temp-audio.m4a",
         remove_temp=True,
         verbose=False,
+        threads=os.cpu_count(),
+        ffmpeg_params=[*codec_params, *_container_params(output_path)] or None,
     )
-    return output_path
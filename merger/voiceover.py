@@ -1,61 +1,128 @@
 """
 配音与 TTS 处理相关逻辑。
 """
+import hashlib
 import logging
 import os
+import re
 import tempfile
-from typing import Optional, Tuple
+import threading
+import wave
+import weakref
+from typing import Dict, Optional, Tuple
 
 import pyttsx3
-from moviepy.editor import AudioFileClip
+from moviepy.audio.AudioClip import AudioArrayClip
 from moviepy.audio.fx import all as afx
 from pydub import AudioSegment
 
 from merger.utils import (
+    audiosegment_to_float_array,
     extract_audio_segment_from_clip,
     pad_or_trim_audio,
     load_audio_segment,
     create_silent_audio,
-    write_audiosegment_to_temp,
+    mix_audio_segments,
+    read_wav_segment,
     safe_remove,
 )
 
+# 混合增益：-6dB 约为原音量一半，-10dB 约为 30%
+_GAIN_MINUS_6DB = 10 ** (-6 / 20)
+_GAIN_MINUS_10DB = 10 ** (-10 / 20)
+
+# pyttsx3 引擎初始化需加载系统语音驱动并枚举声线，按线程缓存复用：驱动与创建线程绑定
+# （SAPI5 的 COM 对象属于创建它的套间，nsss 依赖所在线程的 run loop），不能跨线程共享；
+# 部分驱动底层库为进程级全局状态，合成仍需加锁串行
+_ENGINE_LOCAL = threading.local()
+_ENGINE_LOCK = threading.Lock()
+
+# 声线匹配规则：male 需排除 female（含 nsss 的 VoiceGenderMale 这类无分隔写法）
+_VOICE_PATTERNS = {
+    "B": re.compile(r"(?<!fe)male", re.I),
+    "C": re.compile(r"female", re.I),
+}
+# TTS 结果按 (文本, 声线) 内容寻址缓存，超过数量上限时按最近使用时间淘汰
+_TTS_CACHE_MAX_FILES = int(os.getenv("MERGE_TTS_CACHE_MAX", "64"))
+# 每个引擎的声线索引：voice_type -> (voice id, name)
+_VOICE_INDEX: "weakref.WeakKeyDictionary[pyttsx3.Engine, Dict[str, Tuple[str, str]]]" = weakref.WeakKeyDictionary()
+
 
 def select_voice(engine: pyttsx3.Engine, voice_type: str, logger: logging.Logger) -> Optional[str]:
     """
     根据用户选择的声线挑选合适的 pyttsx3 voice id。
     """
-    voices = engine.getProperty("voices")
-    target_keyword = None
-    if voice_type == "B":
-        target_keyword = "male"
-    elif voice_type == "C":
-        target_keyword = "female"
-
-    if not target_keyword:
+    if voice_type not in _VOICE_PATTERNS:
         return None  # 默认声线
 
-    for voice in voices:
-        desc = f"{getattr(voice, 'name', '')} {getattr(voice, 'gender', '')} {voice.id}".lower()
-        if target_keyword in desc:
-            logger.info("匹配到 TTS 声音：%s", voice.name)
-            return voice.id
+    match = _voice_index(engine).get(voice_type)
+    if match is not None:
+        logger.info("匹配到 TTS 声音：%s", match[1])
+        return match[0]
 
     logger.warning("未找到匹配的声线，使用默认声音。")
     return None
 
 
+def _voice_index(engine: pyttsx3.Engine) -> Dict[str, Tuple[str, str]]:
+    """
+    单次遍历引擎声线，为每种 voice_type 记录首个匹配的 (id, name)，每个引擎只构建一次。
+    声线带 gender 字段时以其为准，否则回退到 name 与 id。
+    """
+    index = _VOICE_INDEX.get(engine)
+    if index is None:
+        index = {}
+        for voice in engine.getProperty("voices"):
+            name = getattr(voice, "name", "") or ""
+            desc = getattr(voice, "gender", None) or f"{name} {voice.id}"
+            for voice_type, pattern in _VOICE_PATTERNS.items():
+                if voice_type not in index and pattern.search(desc):
+                    index[voice_type] = (voice.id, name)
+        _VOICE_INDEX[engine] = index
+    return index
+
+
 def generate_tts_audio(text: str, voice_type: str, output_path: str, logger: logging.Logger) -> None:
     """
     使用 pyttsx3 将文本转换为语音文件。
     """
-    engine = pyttsx3.init()
-    voice_id = select_voice(engine, voice_type, logger)
+    with _ENGINE_LOCK:
+        try:
+            _synthesize(text, voice_type, output_path, logger)
+        except Exception as exc:  # pylint: disable=broad-except
+            # 个别驱动复用引擎时 runAndWait 会报错（含 COM 异常），丢弃本线程缓存的引擎后重试一次
+            logger.warning("复用 TTS 引擎失败，重新初始化：%s", exc)
+            _reset_engine()
+            _synthesize(text, voice_type, output_path, logger)
+    logger.info("TTS 音频已生成：%s", output_path)
+
+
+def _get_engine() -> Tuple[pyttsx3.Engine, Optional[str]]:
+    """
+    返回当前线程的 pyttsx3 引擎及其默认声线 id，需在 _ENGINE_LOCK 内调用。
+    直接构造 Engine：pyttsx3.init() 会按驱动名返回进程内已有的引擎，无法做到按线程隔离。
+    """
+    engine = getattr(_ENGINE_LOCAL, "engine", None)
+    if engine is None:
+        engine = pyttsx3.Engine()
+        _ENGINE_LOCAL.engine = engine
+        _ENGINE_LOCAL.default_voice_id = engine.getProperty("voice")
+    return engine, _ENGINE_LOCAL.default_voice_id
+
+
+def _reset_engine() -> None:
+    _ENGINE_LOCAL.engine = None
+    _ENGINE_LOCAL.default_voice_id = None
+
+
+def _synthesize(text: str, voice_type: str, output_path: str, logger: logging.Logger) -> None:
+    engine, default_voice_id = _get_engine()
+    # 复用的引擎会保留上次设置的声线，默认声线也需显式设回
+    voice_id = select_voice(engine, voice_type, logger) or default_voice_id
     if voice_id:
         engine.setProperty("voice", voice_id)
     engine.save_to_file(text, output_path)
     engine.runAndWait()
-    logger.info("TTS 音频已生成：%s", output_path)
 
 
 def prepare_voice_audio(
@@ -63,14 +130,20 @@ def prepare_voice_audio(
     text_file: str,
     tts_voice: str,
     logger: logging.Logger,
+    text: str = "",
 ) -> Optional[AudioSegment]:
     """
     加载外部配音或根据文本生成 TTS 音频，返回 AudioSegment。
+    text 非空时直接使用该文本，无需经由文本文件中转。
     """
     if voice_path and voice_path.lower() != "none":
         logger.info("加载外部配音文件：%s", voice_path)
         return load_audio_segment(voice_path, logger)
 
+    if text:
+        logger.info("根据配音文本生成 TTS（%d 字）", len(text))
+        return _tts_from_text(text, tts_voice, logger)
+
     if text_file:
         if not os.path.exists(text_file):
             logger.error("配音文本文件不存在：%s", text_file)
@@ -78,19 +151,82 @@ def prepare_voice_audio(
         logger.info("读取配音文本并生成 TTS：%s", text_file)
         with open(text_file, "r", encoding="utf-8") as f:
             content = f.read()
-        fd, temp_audio = tempfile.mkstemp(suffix=".wav")
-        os.close(fd)
-        try:
-            generate_tts_audio(content, tts_voice, temp_audio, logger)
-            audio_seg = load_audio_segment(temp_audio, logger)
-            return audio_seg
-        finally:
-            safe_remove(temp_audio, logger)
+        return _tts_from_text(content, tts_voice, logger)
 
     logger.warning("未提供配音文件或文本，无法生成配音。")
     return None
 
 
+def _tts_from_text(content: str, tts_voice: str, logger: logging.Logger) -> Optional[AudioSegment]:
+    """
+    合成文本对应的 TTS 音频，按 (文本, 声线) 命中磁盘缓存时直接读取。
+    """
+    cache_dir = _tts_cache_dir()
+    key = hashlib.sha1(f"{content}|{tts_voice}".encode("utf-8")).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{key}.wav")
+    try:
+        os.utime(cache_path)  # 同时刷新最近使用时间
+        cached = _load_tts_output(cache_path, logger)
+        if cached is not None and cached.frame_count() > 0:
+            logger.info("命中 TTS 缓存：%s", cache_path)
+            return cached
+        logger.warning("TTS 缓存条目为空，重新生成：%s", cache_path)
+        safe_remove(cache_path, logger)
+    except FileNotFoundError:
+        pass
+
+    # 先合成到临时文件再原子替换，避免中断时留下半成品缓存
+    fd, temp_audio = tempfile.mkstemp(prefix=".tmp-", suffix=".wav", dir=cache_dir)
+    os.close(fd)
+    try:
+        generate_tts_audio(content, tts_voice, temp_audio, logger)
+        audio = _load_tts_output(temp_audio, logger)
+        if audio is None or audio.frame_count() == 0:
+            # 驱动静默失败时会留下空文件或零帧 WAV，不能写入缓存，否则之后会一直命中坏结果
+            logger.error("TTS 输出为空，未写入缓存：%s", temp_audio)
+            return None
+        os.replace(temp_audio, cache_path)
+    finally:
+        safe_remove(temp_audio, logger)
+    _evict_tts_cache(cache_dir, logger)
+    return audio
+
+
+def _tts_cache_dir() -> str:
+    cache_dir = os.path.join(os.getenv("MERGE_CACHE_DIR", "cache"), "tts")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _load_tts_output(path: str, logger: logging.Logger) -> Optional[AudioSegment]:
+    if os.path.getsize(path) == 0:
+        return None
+    try:
+        # TTS 驱动通常直接输出 PCM WAV，用 wave 读取可省去一次 ffmpeg 解码
+        return read_wav_segment(path)
+    except (wave.Error, EOFError):
+        return load_audio_segment(path, logger)
+
+
+def _evict_tts_cache(cache_dir: str, logger: logging.Logger) -> None:
+    """
+    缓存文件数超过上限时删除最久未使用的条目。
+    """
+    entries = []
+    try:
+        for entry in os.scandir(cache_dir):
+            if entry.is_file() and not entry.name.startswith(".tmp-"):
+                entries.append((entry.stat().st_mtime, entry.path))
+    except OSError as exc:
+        logger.warning("读取 TTS 缓存目录失败：%s", exc)
+        return
+    if len(entries) <= _TTS_CACHE_MAX_FILES:
+        return
+    entries.sort()
+    for _, path in entries[: len(entries) - _TTS_CACHE_MAX_FILES]:
+        safe_remove(path, logger)
+
+
 def apply_voice_to_video(
     video_clip,
     voice_audio: AudioSegment,
@@ -98,33 +234,39 @@ def apply_voice_to_video(
     logger: logging.Logger,
 ) -> Tuple:
     """
-    将配音按指定策略叠加到视频，并返回更新后的 clip 与临时音频路径。
+    将配音按指定策略叠加到视频，并返回更新后的 clip 与临时音频路径（音轨直接驻留内存，路径恒为 None）。
     """
     duration_ms = int(video_clip.duration * 1000)
     voice_aligned = pad_or_trim_audio(voice_audio, duration_ms, logger)
 
-    base_audio = extract_audio_segment_from_clip(video_clip, logger)
-    if len(base_audio) == 0:
-        base_audio = create_silent_audio(duration_ms)
-    base_audio = pad_or_trim_audio(base_audio, duration_ms, logger)
-
     if mix_mode == "A":
+        # 覆盖模式不需要原音轨，跳过整段音频解码
         logger.info("配音策略：覆盖原音轨")
         final_audio = voice_aligned
-    elif mix_mode == "C":
-        logger.info("配音策略：原音轨 + 配音背景 (30%%)")
-        voice_bg = voice_aligned - 10  # 约 30% 音量
-        final_audio = base_audio.overlay(voice_bg)
     else:
-        logger.info("配音策略：混合，原音量减半")
-        base_reduced = base_audio - 6  # 减半音量约 -6dB
-        final_audio = base_reduced.overlay(voice_aligned)
+        base_audio = extract_audio_segment_from_clip(video_clip, logger)
+        if len(base_audio) == 0:
+            base_audio = create_silent_audio(duration_ms)
+        elif len(base_audio) < duration_ms:
+            base_audio = pad_or_trim_audio(base_audio, duration_ms, logger)
+        # 原音轨过长时无需先裁剪：mix_audio_segments 会截到与对齐后的配音等长
+        if mix_mode == "C":
+            logger.info("配音策略：原音轨 + 配音背景 (30%%)")
+            final_audio = mix_audio_segments(base_audio, voice_aligned, 1.0, _GAIN_MINUS_10DB)
+        else:
+            logger.info("配音策略：混合，原音量减半")
+            final_audio = mix_audio_segments(base_audio, voice_aligned, _GAIN_MINUS_6DB, 1.0)
+
+    # MoviePy 的 AudioArrayClip 与 audio_fadeout 固定按双声道输出，单声道（如 TTS）配音需先转为立体声，
+    # 否则音轨时长翻倍、播放减速；多声道先下混为单声道（pydub 不支持多声道直接转双声道）
+    if final_audio.channels > 2:
+        final_audio = final_audio.set_channels(1)
+    final_audio = final_audio.set_channels(2).set_frame_rate(44100)
 
-    temp_audio_path = write_audiosegment_to_temp(final_audio, suffix=".wav", logger=logger)
-    audio_clip = AudioFileClip(temp_audio_path)
-    new_clip = video_clip.set_audio(audio_clip)
+    # 混音结果直接包装为内存音频 clip，导出时由 MoviePy 读取采样，无需写出再读回临时 WAV
+    audio_clip = AudioArrayClip(audiosegment_to_float_array(final_audio), fps=final_audio.frame_rate)
     # 使用 moviepy 的 afx.audio_fadeout 确保尾部淡出真实生效（默认 1s，最长不超过视频时长）
     fade_secs = 1.0 if not video_clip.duration else min(1.0, video_clip.duration)
     if fade_secs > 0:
-        new_clip = new_clip.fx(afx.audio_fadeout, fade_secs)
-    return new_clip, temp_audio_path
+        audio_clip = audio_clip.fx(afx.audio_fadeout, fade_secs)
+    return video_clip.set_audio(audio_clip), None
@@ -0,0 +1,33 @@
+"""
+apply_voice_to_video 的回归测试。
+"""
+import logging
+
+import numpy as np
+import pytest
+
+pytest.importorskip("moviepy")
+pytest.importorskip("pyttsx3")
+
+from moviepy.editor import ColorClip  # noqa: E402
+from pydub import AudioSegment  # noqa: E402
+
+from merger.voiceover import apply_voice_to_video  # noqa: E402
+
+
+def _mono_tone(duration_s: float, frame_rate: int = 22050) -> AudioSegment:
+    t = np.arange(int(duration_s * frame_rate)) / frame_rate
+    samples = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16)
+    return AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=frame_rate, channels=1)
+
+
+def test_mono_voice_overwrite_keeps_duration():
+    # 单声道配音（如 TTS 输出）曾被包装成单列 AudioArrayClip，导出后时长翻倍、播放减速
+    video = ColorClip(size=(32, 32), color=(0, 0, 0), duration=2).set_fps(10)
+    clip, temp_path = apply_voice_to_video(video, _mono_tone(2.0), "A", logging.getLogger("test"))
+
+    assert temp_path is None
+    assert clip.audio.duration == pytest.approx(2.0, abs=0.01)
+    frames = clip.audio.to_soundarray(fps=44100)
+    assert frames.shape[1] == 2
+    assert len(frames) == pytest.approx(2 * 44100, abs=441)
@@ -1,19 +1,31 @@
 """
 FastAPI service entry: exposes local HTTP APIs for video merge + voiceover.
 """
+import asyncio
+import base64
+import hashlib
 import json
 import os
+import re
+import shutil
+import subprocess
 import threading
+import time
 import uuid
-from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Literal, Optional, Tuple
+from urllib.parse import urlsplit
 
+import aiofiles
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, RedirectResponse
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import TypeAdapter, ValidationError
 
 from merger import storage
-from merger.utils import ensure_directories, setup_logging, adjust_output_path_extension, safe_remove
+from merger.utils import ensure_directories, setup_logging, adjust_output_path_extension, safe_remove, get_ffmpeg_binary
 from main import run_pipeline
 
 app = FastAPI(
@@ -22,16 +34,19 @@ app = FastAPI(
     version="1.0.0",
 )
 
-# Allow local dev cross-origin access; production can narrow this list.
+# Allowed origins come from CORS_ORIGINS (comma-separated). The dev default "*" is served as a
+# literal wildcard without credentials, so Starlette never has to reflect the request Origin.
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS,
+    allow_credentials="*" not in CORS_ORIGINS,
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization", "Range"],
+    expose_headers=["Content-Range", "Content-Disposition", "ETag"],
+    max_age=86400,
 )
 
-ensure_directories()
 logger = setup_logging()
 UPLOAD_DIR = "uploads"
 FRONTEND_DIST = os.path.join(os.path.dirname(__file__), "frontend", "dist")
@@ -39,60 +54,306 @@ APP_ENV = os.getenv("APP_ENV", "dev")  # dev 环境走本地，其他环境启
 STORAGE_ENABLED = storage.storage_enabled() and APP_ENV != "dev"
 UPLOAD_BUCKET = os.getenv("S3_BUCKET_UPLOADS", "")
 OUTPUT_BUCKET = os.getenv("S3_BUCKET_OUTPUT", "")
+# Resolved once at import; the per-request paths only test these flags.
+MIRROR_UPLOADS = STORAGE_ENABLED and bool(UPLOAD_BUCKET)
+MIRROR_OUTPUT = STORAGE_ENABLED and bool(OUTPUT_BUCKET)
+# Optional CloudFront in front of the output bucket: stable URLs + signed cookies instead of presigned URLs.
+CDN_ENABLED = MIRROR_OUTPUT and storage.cdn_enabled()
+CDN_COOKIE_DOMAIN = os.getenv("CDN_COOKIE_DOMAIN") or None
 OUTPUT_URL_EXPIRE = int(os.getenv("OUTPUT_URL_EXPIRE_SECONDS", "86400"))
-
-
+# Finished jobs (and their local output) are forgotten after this long; defaults to the URL lifetime.
+JOB_TTL = int(os.getenv("JOB_TTL_SECONDS", str(OUTPUT_URL_EXPIRE)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Media uploads are probed on their first PROBE_BYTES. Starlette has already spooled the whole body by now,
+# so this only spares copying, mirroring and queueing a job for a file ffmpeg cannot read.
+PROBE_BYTES = 4 * 1024 * 1024
+# Uploads at least this large get their full size reserved up front (one extent, less fragmentation).
+PREALLOCATE_MIN_BYTES = 16 * 1024 * 1024
+# ISO-BMFF (mp4/mov/m4a) box types: the index may sit at the tail, so a header-only probe cannot judge these
+# and they are accepted unprobed (the common upload format is therefore not checked here).
+_ISOBMFF_BOXES = {b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"}
+# Form fields carrying JSON arrays are parsed and validated in one pass by pydantic-core.
+_TRIMS_ADAPTER = TypeAdapter(List[float])
+_TRIM_MODES_ADAPTER = TypeAdapter(List[Literal["start", "end"]])
+OUTPUT_MIME = {"mp4": "video/mp4", "mov": "video/quicktime", "mkv": "video/x-matroska"}
+# Bounded worker pool: extra jobs wait in the executor queue instead of each getting a thread.
+# Threads (not processes) because job state, logging and the TTS engine are per-process and the
+# heavy lifting already runs in ffmpeg subprocesses.
+MAX_JOBS = int(os.getenv("MAX_JOBS", str(os.cpu_count() or 1)))
+JOB_POOL = ThreadPoolExecutor(max_workers=MAX_JOBS, thread_name_prefix="merge-job")
+# Jobs admitted (running + queued); further requests get 429 rather than piling onto the pool.
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", str(MAX_JOBS * 2)))
+JOB_SLOTS = threading.BoundedSemaphore(MAX_PENDING_JOBS)
+
+
+@dataclass
 class JobRecord:
     """
     Simple in-memory job record.
     """
 
-    def __init__(self, job_id: str):
-        self.job_id = job_id
-        self.status = "pending"  # pending / running / done / error
-        self.output_path: Optional[str] = None
-        self.output_url: Optional[str] = None
-        self.output_key: Optional[str] = None
-        self.error: Optional[str] = None
-        self.temp_files: List[str] = []
+    job_id: str
+    status: str = "pending"  # pending / running / done / error
+    output_path: Optional[str] = None
+    output_url: Optional[str] = None  # presigned object URL, usable without cookies
+    cdn_url: Optional[str] = None  # stable CDN URL, needs output_cookies
+    output_key: Optional[str] = None
+    output_mime: Optional[str] = None
+    output_cookies: Optional[Dict[str, str]] = None
+    error: Optional[str] = None
+    upload_dir: str = ""  # uploads/<shard>/<job_id>/, removed as a whole when the job ends
+    future: Optional[Future] = None
+    finished_at: Optional[float] = None  # time.monotonic() when the job reached done/error
+
+
+class _ResultFileResponse(FileResponse):
+    """
+    FileResponse with 1 MB read chunks for large merged videos; Range/206 handling comes from Starlette.
+    """
+
+    chunk_size = 1024 * 1024
 
 
 # In-memory job map
 JOBS: Dict[str, JobRecord] = {}
 
+# SSE subscribers per job. Queues live on the server loop; workers hand states over via call_soon_threadsafe.
+_JOB_LISTENERS: Dict[str, List[asyncio.Queue]] = {}
+_EVENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+EVENT_KEEPALIVE_SECONDS = 15
+_TERMINAL_STATUSES = {"done", "error"}
+
+
+def _job_state(job: JobRecord) -> Dict[str, Optional[str]]:
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "output_path": job.output_path,
+        "output_url": job.output_url,
+        "error": job.error,
+    }
+
+
+def _fan_out(job_id: str, state: Dict[str, Optional[str]]) -> None:
+    for q in _JOB_LISTENERS.get(job_id, ()):
+        q.put_nowait(state)
+
+
+def _publish(job: JobRecord) -> None:
+    """
+    Push the job's current state to its SSE subscribers; safe to call from worker threads.
+    """
+    if _EVENT_LOOP is not None and job.job_id in _JOB_LISTENERS:
+        _EVENT_LOOP.call_soon_threadsafe(_fan_out, job.job_id, _job_state(job))
+
+
+def _prune_jobs() -> None:
+    """
+    Drop finished jobs older than JOB_TTL so the map (and output/) stays bounded.
+    """
+    cutoff = time.monotonic() - JOB_TTL
+    for job_id, job in list(JOBS.items()):
+        if job.finished_at is not None and job.finished_at < cutoff:
+            JOBS.pop(job_id, None)
+            shutil.rmtree(_job_output_dir(job_id), ignore_errors=True)
+
+
+def _job_output_dir(job_id: str) -> str:
+    """
+    output/<job_id>/: each job writes only here, so pruning one job never touches another's result.
+    """
+    return os.path.join("output", job_id)
+
+
+def _new_id() -> str:
+    """
+    22-char URL-safe base64 form of a uuid4 (the hex form is 32 chars).
+    """
+    return base64.urlsafe_b64encode(uuid.uuid4().bytes)[:22].decode("ascii")
+
+
+# Content-addressed store: one hardlinked copy per distinct upload, shared by every job that sent it.
+CAS_DIR = os.path.join(UPLOAD_DIR, "cas")
+CAS_RETENTION = 24 * 3600
+CAS_SWEEP_INTERVAL = 3600
+_LAST_CAS_SWEEP = 0.0
+
+def _upload_dir(job_id: str) -> str:
+    """
+    Create the job's own directory under a two-level shard of uploads/, so no single
+    directory grows unbounded and cleanup is one rmtree per job.
+    """
+    job_dir = os.path.join(UPLOAD_DIR, job_id[:2], job_id[2:4], job_id)
+    try:
+        os.makedirs(job_dir)
+    except FileNotFoundError:
+        # A concurrent cleanup pruned the shard between makedirs creating it and the final mkdir.
+        os.makedirs(job_dir)
+    return job_dir
+
 
-def _save_upload(upload: UploadFile, prefix: str, job_id: str):
+def _remove_upload_dir(job_dir: str) -> None:
     """
-    Save an uploaded file into the uploads directory, optionally mirror to object storage.
+    Remove a job's upload directory, then prune its shard parents once they are empty.
+    """
+    shutil.rmtree(job_dir, ignore_errors=True)
+    shard = os.path.dirname(job_dir)
+    for path in (shard, os.path.dirname(shard)):
+        try:
+            os.rmdir(path)
+        except OSError:
+            break  # still in use by another job
+
+
+def _probe_header(header: bytes) -> bool:
+    """
+    Return False only when ffmpeg definitively cannot parse the header as media.
+    """
+    if not header:
+        return False
+    if header[4:8] in _ISOBMFF_BOXES:
+        return True
+    try:
+        proc = subprocess.run(
+            [get_ffmpeg_binary(), "-hide_banner", "-i", "pipe:0"],
+            input=header,
+            capture_output=True,
+            timeout=30,
+            check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        logger.warning("Upload probe skipped: %s", exc)
+        return True
+    return b"Invalid data found when processing input" not in proc.stderr
+
+
+async def _save_upload(
+    upload: UploadFile,
+    prefix: str,
+    upload_dir: str,
+    mirrors: List[Tuple[str, str, Optional[str]]],
+    probe: bool = False,
+) -> str:
+    """
+    Save an uploaded file into the uploads directory and queue it for the storage mirror.
+    The body is copied in fixed-size chunks so memory stays flat regardless of file size.
+    With probe=True the first PROBE_BYTES are checked by ffmpeg and unparseable files are rejected with 400
+    before the rest is copied out of Starlette's spool file.
     """
     ext = os.path.splitext(upload.filename or "")[1] or ".dat"
-    filename = f"{prefix}_{uuid.uuid4().hex}{ext}"
-    dest = os.path.join(UPLOAD_DIR, filename)
-    with open(dest, "wb") as f:
-        f.write(upload.file.read())
-
-    storage_key = None
-    storage_url = None
-    if STORAGE_ENABLED and UPLOAD_BUCKET:
-        storage_key = f"uploads/{job_id}/{filename}"
+    filename = f"{prefix}_{_new_id()}{ext}"
+    dest = os.path.join(upload_dir, filename)
+    header = bytearray()
+    probed = not probe
+    valid = True
+    # Content hash for the CAS entry and mirror key, computed on the chunks already in hand.
+    digest = hashlib.sha256()
+    await upload.seek(0)
+    async with aiofiles.open(dest, "wb") as f:
+        # The multipart parser has already spooled the part, so upload.size is the exact length.
+        preallocated = bool(upload.size and upload.size >= PREALLOCATE_MIN_BYTES and hasattr(os, "posix_fallocate"))
+        if preallocated:
+            try:
+                await asyncio.to_thread(os.posix_fallocate, f.fileno(), 0, upload.size)
+            except OSError:
+                preallocated = False  # e.g. filesystem without fallocate support
+        written = 0
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await f.write(chunk)
+            written += len(chunk)
+            digest.update(chunk)
+            if not probed:
+                header += chunk[: PROBE_BYTES - len(header)]
+                if len(header) >= PROBE_BYTES:
+                    probed = True
+                    valid = await asyncio.to_thread(_probe_header, bytes(header))
+                    if not valid:
+                        break
+        if preallocated and written != upload.size:
+            await f.truncate(written)
+    if not probed:
+        valid = await asyncio.to_thread(_probe_header, bytes(header))
+    if not valid:
+        safe_remove(dest, logger)
+        raise HTTPException(status_code=400, detail=f"Unsupported or corrupt media file: {upload.filename}")
+
+    content_name = f"{digest.hexdigest()}{ext.lower()}"
+    _link_to_cas(dest, content_name)
+    if MIRROR_UPLOADS:
+        mirrors.append((dest, f"uploads/sha256/{content_name}", upload.content_type))
+    return dest
+
+
+def _link_to_cas(dest: str, content_name: str) -> None:
+    """
+    Share one inode per distinct upload: replace dest with a hardlink to an existing CAS entry,
+    or register dest as the entry. Falls back to keeping dest as-is where hardlinks are unsupported.
+    """
+    cas_path = os.path.join(CAS_DIR, content_name)
+    try:
         try:
-            storage.upload_file(dest, UPLOAD_BUCKET, storage_key, content_type=upload.content_type, logger=logger)
-            storage_url = storage.presigned_url(UPLOAD_BUCKET, storage_key, expire_seconds=OUTPUT_URL_EXPIRE)
-        except Exception as exc:  # pylint: disable=broad-except
-            logger.warning("Upload mirror to storage failed: %s", exc)
+            os.link(dest, cas_path)
+        except FileExistsError:
+            # Same content already stored: swap our copy for a link so ffmpeg reads hit one page cache.
+            tmp = f"{dest}.link"
+            os.link(cas_path, tmp)
+            os.replace(tmp, dest)
+            os.utime(cas_path)  # restart the retention clock
+    except OSError as exc:
+        logger.warning("Upload dedup skipped for %s: %s", dest, exc)
+
+
+def _sweep_cas() -> None:
+    """
+    Drop CAS entries no job links to any more (nlink == 1) once they are older than CAS_RETENTION.
+    """
+    cutoff = time.time() - CAS_RETENTION
+    try:
+        entries = list(os.scandir(CAS_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            st = entry.stat()
+        except FileNotFoundError:
+            continue
+        if st.st_nlink == 1 and st.st_mtime < cutoff:
+            safe_remove(entry.path, logger)
 
-    return dest, storage_key, storage_url
 
+async def _maybe_sweep_cas() -> None:
+    global _LAST_CAS_SWEEP  # pylint: disable=global-statement
+    now = time.monotonic()
+    if now - _LAST_CAS_SWEEP < CAS_SWEEP_INTERVAL:
+        return
+    _LAST_CAS_SWEEP = now
+    await asyncio.to_thread(_sweep_cas)
 
-def _create_text_file(content: str, prefix: str) -> str:
+
+def _mirror_one(path: str, key: str, content_type: Optional[str]) -> None:
     """
-    Store text content into a temporary file.
+    Upload one file under its content-addressed key unless the object is already there.
     """
-    filename = f"{prefix}_{uuid.uuid4().hex}.txt"
-    dest = os.path.join(UPLOAD_DIR, filename)
-    with open(dest, "w", encoding="utf-8") as f:
-        f.write(content)
-    return dest
+    if storage.object_exists(UPLOAD_BUCKET, key):
+        logger.info("Upload mirror hit, skipping %s", key)
+        return
+    storage.upload_file(path, UPLOAD_BUCKET, key, content_type=content_type, logger=logger)
+
+
+async def _mirror_uploads(mirrors: List[Tuple[str, str, Optional[str]]]) -> None:
+    """
+    Mirror saved uploads to object storage concurrently; failures are logged, not raised.
+    """
+    results = await asyncio.gather(
+        *(asyncio.to_thread(_mirror_one, path, key, content_type) for path, key, content_type in mirrors),
+        return_exceptions=True,
+    )
+    for (_, key, _), result in zip(mirrors, results):
+        if isinstance(result, Exception):
+            logger.warning("Upload mirror to storage failed for %s: %s", key, result)
 
 
 def _run_job(
@@ -102,7 +363,7 @@ def _run_job(
     merge_mode: str,
     use_voice: bool,
     voice_path: str,
-    voice_text_file: str,
+    voice_text: str,
     voice_mix_mode: str,
     tts_voice: str,
     output_format: str,
@@ -112,18 +373,19 @@ def _run_job(
     tail_duration: float = 0.0,
 ) -> None:
     """
-    Execute the heavy lifting in a background thread.
+    Execute the heavy lifting on a JOB_POOL worker.
     """
     job.status = "running"
+    _publish(job)
     try:
-        output_base = os.path.join("output", output_name)
+        output_base = os.path.join(_job_output_dir(job.job_id), os.path.basename(output_name))
         final_path = run_pipeline(
             inputs=video_paths,
             output=output_base,
             merge_mode=merge_mode,
             use_voice=use_voice,
             voice_path=voice_path,
-            voice_text_file=voice_text_file,
+            voice_text=voice_text,
             voice_mix_mode=voice_mix_mode,
             tts_voice=tts_voice,
             output_format=output_format,
@@ -134,12 +396,18 @@ def _run_job(
             tail_duration=tail_duration,
         )
         job.output_path = final_path
-        if STORAGE_ENABLED and OUTPUT_BUCKET and final_path:
+        job.output_mime = OUTPUT_MIME.get(output_format)
+        if MIRROR_OUTPUT and final_path:
             output_key = f"output/{job.job_id}/{os.path.basename(final_path)}"
             try:
                 storage.upload_file(final_path, OUTPUT_BUCKET, output_key, logger=logger)
                 job.output_key = output_key
                 job.output_url = storage.presigned_url(OUTPUT_BUCKET, output_key, expire_seconds=OUTPUT_URL_EXPIRE)
+                if CDN_ENABLED:
+                    job.output_cookies = storage.cdn_signed_cookies(
+                        storage.cdn_url(f"output/{job.job_id}/*"), expire_seconds=OUTPUT_URL_EXPIRE
+                    )
+                    job.cdn_url = storage.cdn_url(output_key)
             except Exception as exc:  # pylint: disable=broad-except
                 logger.warning("Upload output to storage failed: %s", exc)
         job.status = "done"
@@ -148,8 +416,50 @@ def _run_job(
         job.error = str(exc)
         logger.exception("Job %s failed: %s", job.job_id, exc)
     finally:
-        for temp in job.temp_files:
-            safe_remove(temp, logger)
+        if job.upload_dir:
+            _remove_upload_dir(job.upload_dir)
+        job.finished_at = time.monotonic()
+        JOB_SLOTS.release()
+        _publish(job)
+
+
+@app.on_event("startup")
+def _prepare_directories() -> None:
+    """
+    Create the working directories once at boot instead of on every request.
+    """
+    global _EVENT_LOOP  # pylint: disable=global-statement
+    ensure_directories(upload_dir=UPLOAD_DIR)
+    os.makedirs(CAS_DIR, exist_ok=True)
+    _EVENT_LOOP = asyncio.get_running_loop()
+    if CDN_ENABLED:
+        # Fail fast when CDN_* is set but cryptography or the private key is unusable.
+        storage.check_cdn_signer()
+        _check_cdn_cookie_domain()
+
+
+def _check_cdn_cookie_domain() -> None:
+    """
+    Host-only cookies set by the API are never sent to the CDN host, so every CDN download
+    would 403; require a cookie domain that covers the CDN host.
+    """
+    cdn_host = urlsplit(storage.cdn_url("")).hostname or ""
+    if not CDN_COOKIE_DOMAIN:
+        raise RuntimeError(
+            "CDN_COOKIE_DOMAIN must be set when CDN signing is enabled "
+            f"(a parent domain shared by the API host and {cdn_host})"
+        )
+    domain = CDN_COOKIE_DOMAIN.lstrip(".").lower()
+    if cdn_host != domain and not cdn_host.endswith(f".{domain}"):
+        raise RuntimeError(f"CDN_COOKIE_DOMAIN={CDN_COOKIE_DOMAIN} does not cover the CDN host {cdn_host}")
+
+
+@app.on_event("shutdown")
+def _shutdown_job_pool() -> None:
+    """
+    Stop accepting work and drop queued jobs; running jobs finish in the background.
+    """
+    JOB_POOL.shutdown(wait=False, cancel_futures=True)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -162,15 +472,33 @@ async def index():
       <head><title>video_merge_voiceover</title></head>
       <body>
         <h2>video_merge_voiceover Web Service</h2>
-        <p>POST /api/merge to start, GET /api/status/{job_id} for status, GET /api/result/{job_id} to download.</p>
+        <p>POST /api/merge to start, GET /api/status/{job_id} (or SSE /api/events/{job_id}) for status, GET /api/result/{job_id} to download.</p>
         <p>Frontend UI: visit /web (build frontend first).</p>
       </body>
     </html>
     """
 
 
+class _FrontendFiles(StaticFiles):
+    """
+    StaticFiles that lets browsers keep Vite's content-hashed assets forever and revalidate the rest.
+    Vite only emits hashed names under assets/, so files copied from public/ are never marked immutable.
+    """
+
+    _HASHED_ASSET = re.compile(r"-[A-Za-z0-9_-]{8}\.[a-z0-9]+$")
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        full_path = str(full_path)
+        if os.path.basename(os.path.dirname(full_path)) == "assets" and self._HASHED_ASSET.search(full_path):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
 if os.path.isdir(FRONTEND_DIST):
-    app.mount("/web", StaticFiles(directory=FRONTEND_DIST, html=True), name="web")
+    app.mount("/web", _FrontendFiles(directory=FRONTEND_DIST, html=True), name="web")
 
 
 @app.get("/web", response_class=HTMLResponse)
@@ -212,74 +540,67 @@ async def create_merge_job(
     if output_format not in {"mp4", "mov", "mkv"}:
         raise HTTPException(status_code=400, detail="output_format must be mp4/mov/mkv")
 
-    ensure_directories(upload_dir=UPLOAD_DIR)
-
     trim_list: List[float] = []
     if trims:
         try:
-            parsed = json.loads(trims)
-            if isinstance(parsed, list):
-                trim_list = [float(x) for x in parsed]
-        except Exception as exc:  # pylint: disable=broad-except
+            trim_list = _TRIMS_ADAPTER.validate_json(trims)
+        except ValidationError as exc:
             raise HTTPException(status_code=400, detail=f"trims parse failed: {exc}")
 
     trim_mode_list: List[str] = []
     if trim_modes:
         try:
-            parsed_modes = json.loads(trim_modes)
-            if isinstance(parsed_modes, list):
-                trim_mode_list = [str(x).lower() for x in parsed_modes]
-        except Exception as exc:  # pylint: disable=broad-except
-            raise HTTPException(status_code=400, detail=f"trim_modes parse failed: {exc}")
-    for mode in trim_mode_list:
-        if mode not in {"start", "end"}:
-            raise HTTPException(status_code=400, detail=f"Invalid trim mode: {mode}")
+            # Modes are case-insensitive; lowering the raw JSON leaves structure and numbers intact.
+            trim_mode_list = _TRIM_MODES_ADAPTER.validate_json(trim_modes.lower())
+        except ValidationError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid trim_modes: {exc}")
 
     tail_duration = float(tail_duration or 0.0)
 
-    job_id = uuid.uuid4().hex
+    # Reject fast instead of queueing without limit; the slot is released when _run_job finishes.
+    if not JOB_SLOTS.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail="server busy, retry later")
+    job_id = _new_id()
     job = JobRecord(job_id)
-    JOBS[job_id] = job
-
-    # Save videos
-    saved_videos = []
-    for idx, up in enumerate(files):
-        path, _, _ = _save_upload(up, f"video{idx}", job_id)
-        saved_videos.append(path)
-        job.temp_files.append(path)
-
-    # Voice file
-    voice_path = ""
-    if voice_file:
-        voice_path, _, _ = _save_upload(voice_file, "voice", job_id)
-        job.temp_files.append(voice_path)
-
-    # TTS text file
-    voice_text_file = ""
-    if voice_text:
-        voice_text_file = _create_text_file(voice_text, "voice_text")
-        job.temp_files.append(voice_text_file)
-
-    # Tail image
-    tail_image_path = ""
-    if tail_image:
-        tail_image_path, _, _ = _save_upload(tail_image, "tail", job_id)
-        job.temp_files.append(tail_image_path)
-
-    # Output name handling (strip extension; run_pipeline will add it)
-    output_base = adjust_output_path_extension(output_name, output_format)
-    output_base = os.path.splitext(output_base)[0]
-
-    thread = threading.Thread(
-        target=_run_job,
-        args=(
+    try:
+        _prune_jobs()
+        await _maybe_sweep_cas()
+        JOBS[job_id] = job
+        job.upload_dir = _upload_dir(job_id)
+
+        # Save videos
+        mirrors: List[Tuple[str, str, Optional[str]]] = []
+        saved_videos = []
+        for idx, up in enumerate(files):
+            path = await _save_upload(up, f"video{idx}", job.upload_dir, mirrors, probe=True)
+            saved_videos.append(path)
+
+        # Voice file
+        voice_path = ""
+        if voice_file:
+            voice_path = await _save_upload(voice_file, "voice", job.upload_dir, mirrors, probe=True)
+
+        # Tail image
+        tail_image_path = ""
+        if tail_image:
+            tail_image_path = await _save_upload(tail_image, "tail", job.upload_dir, mirrors)
+
+        if mirrors:
+            await _mirror_uploads(mirrors)
+
+        # Output name handling (strip extension; run_pipeline will add it)
+        output_base = adjust_output_path_extension(output_name, output_format)
+        output_base = os.path.splitext(output_base)[0]
+
+        job.future = JOB_POOL.submit(
+            _run_job,
             job,
             saved_videos,
             output_base,
             merge_mode,
             use_voice,
             voice_path,
-            voice_text_file,
+            voice_text,
             voice_mix_mode,
             tts_voice,
             output_format,
@@ -287,10 +608,14 @@ async def create_merge_job(
             trim_mode_list,
             tail_image_path,
             tail_duration,
-        ),
-        daemon=True,
-    )
-    thread.start()
+        )
+    except BaseException:
+        # Staging failed (e.g. a rejected upload): drop the half-built job and its files.
+        JOBS.pop(job.job_id, None)
+        if job.upload_dir:
+            _remove_upload_dir(job.upload_dir)
+        JOB_SLOTS.release()
+        raise
 
     return JSONResponse({"job_id": job_id, "status": job.status})
 
@@ -303,13 +628,45 @@ async def get_status(job_id: str):
     job = JOBS.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="job not found")
-    return {
-        "job_id": job_id,
-        "status": job.status,
-        "output_path": job.output_path,
-        "output_url": job.output_url,
-        "error": job.error,
-    }
+    return _job_state(job)
+
+
+@app.get("/api/events/{job_id}")
+async def job_events(job_id: str):
+    """
+    Stream job state changes as Server-Sent Events until the job finishes.
+    """
+    job = JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job not found")
+    q: asyncio.Queue = asyncio.Queue()
+    # Subscribe before reading the current state so no transition falls in between.
+    _JOB_LISTENERS.setdefault(job_id, []).append(q)
+    q.put_nowait(_job_state(job))
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    state = await asyncio.wait_for(q.get(), timeout=EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(state)}\n\n"
+                if state["status"] in _TERMINAL_STATUSES:
+                    break
+        finally:
+            listeners = _JOB_LISTENERS.get(job_id, [])
+            if q in listeners:
+                listeners.remove(q)
+            if not listeners:
+                _JOB_LISTENERS.pop(job_id, None)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/api/result/{job_id}")
@@ -322,15 +679,45 @@ async def download_result(job_id: str):
         raise HTTPException(status_code=404, detail="job not found")
     if job.status != "done":
         raise HTTPException(status_code=400, detail="job not completed or no output")
+    if job.cdn_url and job.output_cookies:
+        # Scope the cookies to this job's prefix so concurrent downloads don't overwrite each other's policy.
+        cookie_path = urlsplit(storage.cdn_url(f"output/{job.job_id}/")).path
+        response = RedirectResponse(job.cdn_url)
+        for name, value in job.output_cookies.items():
+            response.set_cookie(
+                name,
+                value,
+                max_age=OUTPUT_URL_EXPIRE,
+                path=cookie_path,
+                domain=CDN_COOKIE_DOMAIN,
+                secure=True,
+                httponly=True,
+                samesite="lax",
+            )
+        return response
     if job.output_url:
         return RedirectResponse(job.output_url)
-    if not job.output_path or not os.path.exists(job.output_path):
+    try:
+        stat_result = os.stat(job.output_path) if job.output_path else None
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is None:
         raise HTTPException(status_code=404, detail="output file not found")
     filename = os.path.basename(job.output_path)
-    return FileResponse(path=job.output_path, filename=filename, media_type="application/octet-stream")
+    # Reuse the stat we already have; Starlette answers Range requests with 206 + Content-Range
+    # and derives the ETag from size + mtime, so repeat GETs can be served from the browser cache.
+    return _ResultFileResponse(
+        path=job.output_path,
+        filename=filename,
+        media_type=job.output_mime or "application/octet-stream",
+        stat_result=stat_result,
+        headers={"Cache-Control": f"private, max-age={OUTPUT_URL_EXPIRE}"},
+    )
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # loop/http "auto" pick uvloop and httptools when installed (uvicorn[standard]).
+    # Keep a single worker: JOBS and the job pool are per-process.
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto", backlog=4096)